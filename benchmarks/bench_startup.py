@@ -0,0 +1,132 @@
+"""
+Startup-time benchmark for the Food Price Tracker.
+
+Tracks the time to import the app modules in a fresh interpreter and the time to
+produce the first render (clean data, enrich it and build the charts) from the
+bundled Japan dataset, so no network access is required.
+
+Usage
+-----
+    python benchmarks/bench_startup.py [--repeat 5] [--app]
+
+`--app` additionally runs the full Streamlit script once through
+`streamlit.testing.v1.AppTest`, which fetches data from HDX.
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+RAW_DATA_PATH = os.path.join(ROOT_DIR, "data", "raw", "wfp_food_prices_jpn.csv")
+
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+RENDER_SNIPPET = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import pandas as pd
+from data import *
+from plotting import *
+data = pd.read_csv({path!r}, parse_dates=["date"], header=0, skiprows=[1])
+data = get_clean_data(data)
+markets = data.market.value_counts().index.tolist()[:2]
+commodities = data.commodity.value_counts().index.tolist()[:2]
+date_range = pd.to_datetime([data.date.min(), data.date.max()])
+data = generate_food_price_index_data(data, date_range, markets, commodities)
+data = generate_overall_data(data)
+lines = generate_line_chart(data)
+figures = generate_figure_chart(data)
+for chart in lines.values():
+    chart.to_dict()
+print(time.perf_counter() - start)
+"""
+
+
+def time_snippet(snippet, repeat):
+    """
+    Run a snippet in fresh interpreters and collect the timing it prints.
+
+    Parameters
+    ----------
+    snippet : str
+        Python source that prints a single elapsed time in seconds.
+    repeat : int
+        Number of fresh interpreters to run.
+
+    Returns
+    -------
+    list of float
+        Elapsed times in seconds.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        try:
+            output = subprocess.run(
+                [sys.executable, "-c", snippet],
+                check=True,
+                capture_output=True,
+                text=True,
+                cwd=ROOT_DIR,
+            ).stdout
+        except subprocess.CalledProcessError as exc:
+            print(exc.stderr, file=sys.stderr)
+            raise
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def time_app():
+    """
+    Run the Streamlit script once with AppTest and return the elapsed time.
+
+    Returns
+    -------
+    float
+        Elapsed time in seconds.
+    """
+
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, SRC_DIR)
+    start = time.perf_counter()
+    AppTest.from_file(os.path.join(SRC_DIR, "streamlit_app.py"), default_timeout=600).run()
+    return time.perf_counter() - start
+
+
+def report(name, timings):
+    print(
+        f"{name:<20} median {statistics.median(timings) * 1000:9.1f} ms"
+        f"  min {min(timings) * 1000:9.1f} ms  (n={len(timings)})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--app", action="store_true")
+    args = parser.parse_args()
+
+    for module in ["data", "plotting"]:
+        report(
+            f"import {module}",
+            time_snippet(IMPORT_SNIPPET.format(src=SRC_DIR, module=module), args.repeat),
+        )
+    report(
+        "first render",
+        time_snippet(RENDER_SNIPPET.format(src=SRC_DIR, path=RAW_DATA_PATH), args.repeat),
+    )
+    if args.app:
+        report("app first run", [time_app()])
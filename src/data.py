@@ -1,19 +1,88 @@
+import os
 import itertools
+import functools
+import numpy as np
 import pandas as pd
-import country_converter as coco
 
-from hdx.api.configuration import Configuration
-from hdx.data.dataset import Dataset
 
 # Data Loading
 
-# create HDX configuration
-Configuration.create(
-    hdx_site="prod",
-    user_agent="DSCI-532_2024_19_food-price-tracker-indiv",
-    hdx_read_only=True,
+COUNTRY_NAMES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "country_names.csv"
 )
 
+@functools.lru_cache(maxsize=None)
+def configure_hdx():
+    """
+    Create the HDX configuration on first use.
+
+    The HDX client is imported here rather than at module level so that importing this
+    module stays cheap; the configuration is created once per process.
+
+    Returns
+    -------
+    hdx.data.dataset.Dataset
+        The HDX Dataset class, ready to query the production site.
+    """
+
+    from hdx.api.configuration import Configuration
+    from hdx.data.dataset import Dataset
+
+    Configuration.create(
+        hdx_site="prod",
+        user_agent="DSCI-532_2024_19_food-price-tracker-indiv",
+        hdx_read_only=True,
+    )
+
+    return Dataset
+
+@functools.lru_cache(maxsize=None)
+def load_country_names():
+    """
+    Load the bundled ISO3 to short country name table, once per process.
+
+    Returns
+    -------
+    pandas.Series
+        Short country names indexed by ISO3 code.
+    """
+
+    return pd.read_csv(COUNTRY_NAMES_PATH, index_col="countryiso3")["country"]
+
+def convert_country_names(iso3_series):
+    """
+    Convert ISO3 country codes into short country names.
+
+    Names are looked up in the bundled table at data/country_names.csv. Only codes missing
+    from the table fall back to country_converter, which is imported on demand.
+
+    Parameters
+    ----------
+    iso3_series : pandas.Series
+        ISO3 country codes.
+
+    Returns
+    -------
+    pandas.Series
+        Short country names, aligned with the input index.
+
+    Examples
+    --------
+    >>> convert_country_names(pd.Series(["JPN", "UKR"]))
+    """
+
+    names = iso3_series.map(load_country_names())
+
+    missing = names.isna()
+    if missing.any():
+        import country_converter as coco
+
+        names[missing] = coco.CountryConverter().pandas_convert(
+            series=iso3_series[missing], to="name_short"
+        )
+
+    return names
+
 def fetch_country_index():
     """
     Fetch country index and preprocess into dataframe.
@@ -29,7 +98,7 @@ def fetch_country_index():
     >>> country_index = fetch_country_index()
     """
 
-    cc = coco.CountryConverter()
+    Dataset = configure_hdx()
 
     country_index_df = pd.read_csv(
         Dataset.read_from_hdx("global-wfp-food-prices").get_resource(0)["url"],
@@ -39,14 +108,14 @@ def fetch_country_index():
     )
 
     country_index_df = country_index_df.assign(
-        country=cc.pandas_convert(series=country_index_df.countryiso3, to="name_short"),
+        country=convert_country_names(country_index_df.countryiso3),
         hdx_identifier=country_index_df.url.str.rsplit("/", n=1).str[1],
     ).set_index("country")
 
     return country_index_df
 
 
-def fetch_country_data(country, country_index_df=fetch_country_index()):
+def fetch_country_data(country, country_index_df=None):
     """
     Fetch and preprocess data from HDX (https://data.humdata.org/)
     Dynamically load the corresponding country dataset and preprocess.
@@ -57,7 +126,7 @@ def fetch_country_data(country, country_index_df=fetch_country_index()):
         The country of which data should be recieved. Must be within the HDX and country_index_df. By default "Japan"
 
     country_index_df : pd.DataFrame, optional
-        Index dataset from "global-wfp-food-prices" in the HDX, the output from fetch_country_index_df(). By default, the output from fetch_country_index_df().
+        Index dataset from "global-wfp-food-prices" in the HDX, the output from fetch_country_index_df(). By default, the output from fetch_country_index(), fetched on first call.
 
     Returns
     -------
@@ -79,6 +148,10 @@ def fetch_country_data(country, country_index_df=fetch_country_index()):
         "usdprice",
     ]
 
+    if country_index_df is None:
+        country_index_df = fetch_country_index()
+    Dataset = configure_hdx()
+
     country_df = pd.read_csv(
         Dataset.read_from_hdx(
             country_index_df.loc[country, "hdx_identifier"]
@@ -92,23 +165,19 @@ def fetch_country_data(country, country_index_df=fetch_country_index()):
 
 # Data Preprocessing
 
-def filter_major_data(data, date_abundance_threshold=0.5, market_abundance_threshold=0.7):
+def deduplicate_unit_data(data):
     """
-    Filter major data based on specified thresholds for date and market abundance.
+    Keep the most frequent unit of each commodity and deduplicate on (date, commodity, market).
 
     Parameters
     ----------
     data : pandas.DataFrame
         Input food price raw data.
-    date_abundance_threshold : float, optional
-        The threshold percentage of data existence for each (commodity, market) pair relative to the full duration length. Defaults to 0.5.
-    market_abundance_threshold : float, optional
-         The threshold percentage of markets where data of a commodity exists, relative to the total number of markets. Defaults to 0.7.
 
     Returns
     -------
     pandas.DataFrame
-        A DataFrame containing major data filtered based on the specified thresholds.
+        A DataFrame with a single unit per commodity and a single price per (date, commodity, market).
 
     """
 
@@ -144,44 +213,188 @@ def filter_major_data(data, date_abundance_threshold=0.5, market_abundance_thres
         .reset_index()
     )
 
-    # Rule 1 - data existence for each (commodity, market) pair relative to the full duration length >= x%
-    num_date = clean_data_df["date"].nunique()
-    map_df = (
-        clean_data_df.groupby(["market", "commodity"]).agg(
-            {"usdprice": "count"}
-        )
-        >= date_abundance_threshold * num_date
-    )
-    map_df = map_df.rename(columns={"usdprice": "is_kept"})
-    clean_data_df = clean_data_df.merge(
-        map_df, how="left", on=["market", "commodity"]
+    return clean_data_df
+
+def compute_abundance_stats(data):
+    """
+    Compute the abundance statistics of each (market, commodity) pair used by the cleaning thresholds.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Deduplicated food price data, the output from deduplicate_unit_data().
+
+    Returns
+    -------
+    pandas.DataFrame
+        A DataFrame indexed by (market, commodity) with the number of dates with a price ("date_count"),
+        the number of distinct dates in the whole dataset ("num_date") and the first and last dates
+        of the pair ("first_date", "last_date").
+
+    """
+
+    abundance_df = data.groupby(["market", "commodity"]).agg(
+        date_count=("usdprice", "count"),
+        first_date=("date", "min"),
+        last_date=("date", "max"),
     )
-    clean_data_df = clean_data_df[
-        clean_data_df["is_kept"] == True
-    ].drop(columns=["is_kept"])
+    abundance_df["num_date"] = data["date"].nunique()
+
+    return abundance_df
+
+def select_major_groups(abundance_df, date_abundance_threshold=0.5, market_abundance_threshold=0.7):
+    """
+    Select the (market, commodity) pairs that pass the date and market abundance thresholds.
+
+    Parameters
+    ----------
+    abundance_df : pandas.DataFrame
+        Abundance statistics, the output from compute_abundance_stats().
+    date_abundance_threshold : float, optional
+        The threshold percentage of data existence for each (commodity, market) pair relative to the full duration length. Defaults to 0.5.
+    market_abundance_threshold : float, optional
+         The threshold percentage of markets where data of a commodity exists, relative to the total number of markets. Defaults to 0.7.
+
+    Returns
+    -------
+    numpy.ndarray
+        A boolean array aligned with the rows of abundance_df, True for the pairs to keep.
+
+    """
+
+    # Rule 1 - data existence for each (commodity, market) pair relative to the full duration length >= x%
+    is_kept = (
+        abundance_df["date_count"] >= date_abundance_threshold * abundance_df["num_date"]
+    ).to_numpy()
 
     # Rule 2 - data of a commodity exists, relative to the total number of markets >= x%
-    num_market = clean_data_df["market"].nunique()
+    kept_df = abundance_df[is_kept].reset_index()
+    num_market = kept_df["market"].nunique()
     map_df = (
-        clean_data_df.groupby(["commodity"]).agg(
-            {"market": "nunique"}
-        )
+        kept_df.groupby(["commodity"])["market"].nunique()
         >= market_abundance_threshold * num_market
     )
-    map_df = map_df.rename(columns={"market": "is_kept"})
-    clean_data_df = clean_data_df.merge(
-        map_df, how="left", on=["commodity"]
+    is_kept &= abundance_df.index.get_level_values("commodity").isin(
+        map_df.index[map_df]
+    )
+
+    return is_kept
+
+def filter_major_data(data, date_abundance_threshold=0.5, market_abundance_threshold=0.7):
+    """
+    Filter major data based on specified thresholds for date and market abundance.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Input food price raw data.
+    date_abundance_threshold : float, optional
+        The threshold percentage of data existence for each (commodity, market) pair relative to the full duration length. Defaults to 0.5.
+    market_abundance_threshold : float, optional
+         The threshold percentage of markets where data of a commodity exists, relative to the total number of markets. Defaults to 0.7.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A DataFrame containing major data filtered based on the specified thresholds.
+
+    """
+
+    clean_data_df = deduplicate_unit_data(data)
+    abundance_df = compute_abundance_stats(clean_data_df)
+    is_kept = select_major_groups(
+        abundance_df, date_abundance_threshold, market_abundance_threshold
     )
     clean_data_df = clean_data_df[
-        clean_data_df["is_kept"] == True
-    ].drop(columns=["is_kept"])
+        pd.MultiIndex.from_frame(clean_data_df[["market", "commodity"]]).isin(
+            abundance_df.index[is_kept]
+        )
+    ]
 
     return clean_data_df
 
+def _fill_missing_data_arrays(data, method="forward"):
+    """
+    Array implementation of fill_missing_data() for data with a single row per (date, market, commodity).
+
+    Each (market, commodity) pair is a row of a (pair, month) table holding, for every filled
+    column, the row of the last value observed up to that month, or -1 before the first one.
+    The result is identical to the pandas implementation in fill_missing_data().
+    """
+
+    # Default Info
+    columns_to_keep = [
+        "date",
+        "market",
+        "latitude",
+        "longitude",
+        "commodity",
+        "unit",
+        "usdprice",
+    ]
+    fill_columns = ["latitude", "longitude", "unit", "usdprice"]
+
+    # Monthly date grid, as in fill_missing_data()
+    grid = pd.date_range(
+        pd.offsets.MonthBegin().rollback(data["date"].min()), data["date"].max(), freq="MS"
+    ) + pd.DateOffset(days=14)
+    num_month = len(grid)
+
+    # Encode (market, commodity) as a group in product order, and date as a month on the grid
+    market_codes, market_uniques = pd.factorize(data["market"])
+    commodity_codes, commodity_uniques = pd.factorize(data["commodity"])
+    num_group = len(market_uniques) * len(commodity_uniques)
+    group = market_codes.astype(np.int64) * len(commodity_uniques) + commodity_codes
+    month = (
+        (data["date"].dt.year.to_numpy() - grid[0].year) * 12
+        + data["date"].dt.month.to_numpy() - grid[0].month
+    )
+    on_grid = (month >= 0) & (month < num_month)
+    on_grid[on_grid] = data["date"].to_numpy()[on_grid] == grid.to_numpy()[month[on_grid]]
+
+    # Sort by (group, month), so the last observed row is the largest row index up to each month
+    order = np.lexsort((month[on_grid], group[on_grid]))
+    rows = data[on_grid].iloc[order]
+    group = group[on_grid][order]
+    month = month[on_grid][order]
+    row_index = np.arange(len(rows), dtype=np.int32)
+
+    # Source row of each filled column, laid out in (date, market, commodity) order
+    source = np.empty((len(fill_columns), num_month * num_group), dtype=np.int32)
+    for k, column in enumerate(fill_columns):
+        is_set = rows[column].notna().to_numpy()
+        column_source = np.full((num_group, num_month), -1, dtype=np.int32)
+        column_source[group[is_set], month[is_set]] = row_index[is_set]
+        if method == "forward":
+            np.maximum.accumulate(column_source, axis=1, out=column_source)
+        source[k] = column_source.T.ravel()
+
+    position = np.flatnonzero(source[fill_columns.index("usdprice")] >= 0)
+    source = source[:, position]
+    group_position = position % num_group
+
+    full_data_df = pd.DataFrame(
+        {
+            "date": grid[position // num_group],
+            "market": market_uniques.take(group_position // len(commodity_uniques)),
+            "commodity": commodity_uniques.take(group_position % len(commodity_uniques)),
+        },
+        index=position,
+    )
+    for k, column in enumerate(fill_columns):
+        full_data_df[column] = pd.Series(
+            rows[column].to_numpy().take(source[k], mode="clip"), index=position
+        ).where(source[k] >= 0)
+
+    return full_data_df[columns_to_keep]
+
 def fill_missing_data(data, method="forward"):
     """
     Fills missing values in the USD price column based on specified method.
 
+    Data with a single row per (date, market, commodity) and no missing keys is filled by an
+    array implementation; other data falls back to the pandas implementation below.
+
     Parameters
     ----------
     data : pandas.DataFrame
@@ -207,10 +420,17 @@ def fill_missing_data(data, method="forward"):
         "usdprice",
     ]
 
+    # The array implementation requires a single row per (date, market, commodity) and no missing keys
+    if (
+        not data[["date", "market", "commodity"]].isna().any(axis=None)
+        and not data.duplicated(["date", "market", "commodity"]).any()
+    ):
+        return _fill_missing_data_arrays(data, method)
+
     # Generate dataframe with full combinations of factors
     full_data_df = pd.DataFrame(
         itertools.product(
-            pd.date_range(data["date"].min(), data["date"].max(), freq='MS') + pd.DateOffset(days=14),
+            pd.date_range(pd.offsets.MonthBegin().rollback(data["date"].min()), data["date"].max(), freq='MS') + pd.DateOffset(days=14),
             # data["date"].unique(),
             data["market"].unique(),
             data["commodity"].unique(),
@@ -238,7 +458,167 @@ def fill_missing_data(data, method="forward"):
 
     return full_data_df
 
-def get_clean_data(data_df):
+def prepare_clean_data(data_df):
+    """
+    Precompute the threshold-independent part of the cleaning, once per dataset.
+
+    Every (market, commodity) pair is deduplicated and filled on its own, so the result
+    for any pair of thresholds is a subset of the filled data computed here.
+
+    Parameters
+    ----------
+    data_df : pandas.DataFrame
+        Raw data.
+
+    Returns
+    -------
+    tuple of pandas.DataFrame
+        The filled data of every (market, commodity) pair, with a "group" column referring to
+        the row of the abundance statistics, and the abundance statistics from compute_abundance_stats().
+    """
+
+    data_df = deduplicate_unit_data(data_df)
+    abundance_df = compute_abundance_stats(data_df)
+    fill_df = fill_missing_data(data_df)
+    fill_df["group"] = abundance_df.index.get_indexer(
+        pd.MultiIndex.from_frame(fill_df[["market", "commodity"]])
+    )
+
+    return fill_df, abundance_df
+
+def abundance_threshold_mask(data, abundance_df, date_abundance_threshold=0.5, market_abundance_threshold=0.7, markets=None, commodities=None):
+    """
+    Returns the rows of precomputed data that are kept for the given thresholds.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Data with the "group" and "date" columns of the first output from prepare_clean_data().
+    abundance_df : pandas.DataFrame
+        Abundance statistics, the second output from prepare_clean_data().
+    date_abundance_threshold : float, optional
+        The threshold percentage of data existence for each (commodity, market) pair relative to the full duration length. Defaults to 0.5.
+    market_abundance_threshold : float, optional
+         The threshold percentage of markets where data of a commodity exists, relative to the total number of markets. Defaults to 0.7.
+    markets : list, optional
+        If given, only the rows of these markets are kept.
+    commodities : list, optional
+        If given, only the rows of these commodities are kept.
+
+    Returns
+    -------
+    numpy.ndarray
+        A boolean array aligned with the rows of data, True for the rows to keep.
+    """
+
+    is_kept = select_major_groups(
+        abundance_df, date_abundance_threshold, market_abundance_threshold
+    )
+    if not is_kept.any():
+        return np.zeros(len(data), dtype=bool)
+
+    # Forward fill stops at the last month of all the kept pairs
+    end_date = pd.offsets.MonthBegin().rollback(
+        abundance_df["last_date"][is_kept].max()
+    ) + pd.DateOffset(days=14)
+
+    if markets is not None:
+        is_kept &= abundance_df.index.get_level_values("market").isin(markets)
+    if commodities is not None:
+        is_kept &= abundance_df.index.get_level_values("commodity").isin(commodities)
+
+    return is_kept[data["group"].to_numpy()] & (
+        data["date"].to_numpy() <= end_date.to_datetime64()
+    )
+
+def apply_abundance_thresholds(fill_df, abundance_df, date_abundance_threshold=0.5, market_abundance_threshold=0.7, markets=None, commodities=None):
+    """
+    Returns cleaned data for the given thresholds from the precomputed data.
+
+    Parameters
+    ----------
+    fill_df : pandas.DataFrame
+        Filled data, the first output from prepare_clean_data().
+    abundance_df : pandas.DataFrame
+        Abundance statistics, the second output from prepare_clean_data().
+    date_abundance_threshold : float, optional
+        The threshold percentage of data existence for each (commodity, market) pair relative to the full duration length. Defaults to 0.5.
+    market_abundance_threshold : float, optional
+         The threshold percentage of markets where data of a commodity exists, relative to the total number of markets. Defaults to 0.7.
+    markets : list, optional
+        If given, only the data of these markets is returned. Restricting the selection here avoids
+        copying the rows that are not displayed.
+    commodities : list, optional
+        If given, only the data of these commodities is returned.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Dataframe containing cleaned major data.
+    """
+
+    # Default Info
+    columns_to_keep = [
+        "date",
+        "market",
+        "latitude",
+        "longitude",
+        "commodity",
+        "unit",
+        "usdprice",
+    ]
+
+    mask = abundance_threshold_mask(
+        fill_df,
+        abundance_df,
+        date_abundance_threshold,
+        market_abundance_threshold,
+        markets,
+        commodities,
+    )
+
+    # Take the rows before the columns, so only the kept rows are copied
+    return fill_df.take(np.flatnonzero(mask))[columns_to_keep]
+
+def summarize_abundance_thresholds(fill_df, abundance_df, date_abundance_threshold=0.5, market_abundance_threshold=0.7):
+    """
+    Summarize the cleaned data for the given thresholds without copying it.
+
+    Parameters
+    ----------
+    fill_df : pandas.DataFrame
+        Filled data, the first output from prepare_clean_data().
+    abundance_df : pandas.DataFrame
+        Abundance statistics, the second output from prepare_clean_data().
+    date_abundance_threshold : float, optional
+        The threshold percentage of data existence for each (commodity, market) pair relative to the full duration length. Defaults to 0.5.
+    market_abundance_threshold : float, optional
+         The threshold percentage of markets where data of a commodity exists, relative to the total number of markets. Defaults to 0.7.
+
+    Returns
+    -------
+    tuple
+        A pandas.Series with the number of cleaned rows of each kept (market, commodity) pair,
+        and the first and last dates of the cleaned data (None when no data is kept).
+    """
+
+    mask = abundance_threshold_mask(
+        fill_df, abundance_df, date_abundance_threshold, market_abundance_threshold
+    )
+    counts = pd.Series(
+        np.bincount(fill_df["group"].to_numpy()[mask], minlength=len(abundance_df)),
+        index=abundance_df.index,
+        name="count",
+    )
+    counts = counts[counts > 0]
+    if counts.empty:
+        return counts, None, None
+
+    dates = fill_df["date"].to_numpy()[mask]
+
+    return counts, pd.Timestamp(dates.min()), pd.Timestamp(dates.max())
+
+def get_clean_data(data_df, date_abundance_threshold=0.5, market_abundance_threshold=0.7):
     """
     Returns data containing cleaned data.
 
@@ -246,6 +626,10 @@ def get_clean_data(data_df):
     ----------
     data_df : str
         Raw data.
+    date_abundance_threshold : float, optional
+        The threshold percentage of data existence for each (commodity, market) pair relative to the full duration length. Defaults to 0.5.
+    market_abundance_threshold : float, optional
+         The threshold percentage of markets where data of a commodity exists, relative to the total number of markets. Defaults to 0.7.
 
     Returns
     -------
@@ -254,12 +638,139 @@ def get_clean_data(data_df):
     """
 
     # data_df = pd.read_json(StringIO(data_json), orient='split')
-    data_df = filter_major_data(data_df)
-    data_df = fill_missing_data(data_df)
+    fill_df, abundance_df = prepare_clean_data(data_df)
+    data_df = apply_abundance_thresholds(
+        fill_df, abundance_df, date_abundance_threshold, market_abundance_threshold
+    )
 
     # return data_df.to_json(date_format='iso', orient='split')
     return data_df
 
+# Data Analytics
+
+def _lag_values(values, series_month, month, lag):
+    """
+    Shift values by lag months within each series, NaN where the lagged month is missing.
+
+    The row of the lagged month is looked up in the sorted series_month key, so gaps in a
+    series do not shift the lag onto another month.
+    """
+
+    lagged = np.full(len(values), np.nan)
+    index = np.flatnonzero(month >= lag)
+    lagged_index = np.searchsorted(series_month, series_month[index] - lag)
+    is_found = series_month[lagged_index] == series_month[index] - lag
+    lagged[index[is_found]] = values[lagged_index[is_found]]
+
+    return lagged
+
+def _rolling_values(values, month, position, window):
+    """
+    Rolling mean and standard deviation over window months within each series.
+
+    As months are unique and increasing within a series, a window of rows spanning exactly
+    window - 1 months covers every calendar month of the window; windows with a missing month
+    or value are NaN. The deviations are summed around the
+    window mean, and standard deviations below its rounding error are set to zero, so that
+    constant windows, common after the forward fill, have no spurious spread.
+    """
+
+    mean = np.full(len(values), np.nan)
+    std = np.full(len(values), np.nan)
+    index = np.flatnonzero(position >= window - 1)
+    index = index[month[index] - month[index - window + 1] == window - 1]
+
+    total = np.zeros(len(index))
+    for offset in range(window):
+        total += values[index - offset]
+    window_mean = total / window
+
+    total_square = np.zeros(len(index))
+    for offset in range(window):
+        total_square += (values[index - offset] - window_mean) ** 2
+
+    mean[index] = window_mean
+    if window > 1:
+        window_std = np.sqrt(total_square / (window - 1))
+        rounding_error = window * np.finfo(float).eps * np.abs(window_mean)
+        window_std[window_std <= rounding_error] = 0
+        std[index] = window_std
+
+    return mean, std
+
+def compute_series_statistics(data, lags=(1, 3, 12), windows=(3, 12)):
+    """
+    Compute lagged returns and rolling statistics of every (market, commodity) price series at once.
+
+    The data is sorted once by (market, commodity, date) and every statistic is computed in a
+    single vectorized pass over the contiguous price array. Lags and windows are in months;
+    a value is NaN when the months it depends on are missing from the series.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Cleaned food price data in long format, with a single row per (date, market, commodity)
+        and datetime dates.
+    lags : tuple of int, optional
+        Lags of the relative changes, in months. Defaults to (1, 3, 12).
+    windows : tuple of int, optional
+        Lengths of the rolling windows, in months. Defaults to (3, 12).
+
+    Returns
+    -------
+    pandas.DataFrame
+        The input data sorted by (market, commodity, date), with a "return_<lag>" column for each lag,
+        and "rolling_mean_<window>", "rolling_std_<window>", "volatility_<window>" (rolling standard
+        deviation of the monthly return) and "zscore_<window>" (deviation of the price from the
+        rolling mean, in rolling standard deviations) columns for each window.
+
+    Examples
+    --------
+    >>> statistics = compute_series_statistics(get_clean_data(data), lags=(1, 12), windows=(12,))
+    """
+
+    market_codes, _ = pd.factorize(data["market"], sort=True)
+    commodity_codes, _ = pd.factorize(data["commodity"], sort=True)
+    month = (data["date"].dt.year * 12 + data["date"].dt.month).to_numpy()
+
+    # Sort once by (market, commodity, date)
+    order = np.lexsort((month, commodity_codes, market_codes))
+    statistics_df = data.iloc[order].reset_index(drop=True)
+    month = month[order] - month.min()
+    price = statistics_df["usdprice"].to_numpy(dtype=float)
+
+    # Series number and position of each row within its series
+    row = np.arange(len(statistics_df))
+    is_first = np.ones(len(statistics_df), dtype=bool)
+    is_first[1:] = (market_codes[order][1:] != market_codes[order][:-1]) | (
+        commodity_codes[order][1:] != commodity_codes[order][:-1]
+    )
+    if np.any(~is_first[1:] & (month[1:] == month[:-1])):
+        raise ValueError("data must have a single row per (date, market, commodity)")
+    series = np.cumsum(is_first) - 1
+    position = row - np.maximum.accumulate(np.where(is_first, row, 0))
+
+    # Sorted (series, month) key to look up the lagged months
+    series_month = series * (month.max() + 1) + month
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for lag in lags:
+            statistics_df[f"return_{lag}"] = price / _lag_values(price, series_month, month, lag) - 1
+
+        monthly_return = price / _lag_values(price, series_month, month, 1) - 1
+        for window in windows:
+            mean, std = _rolling_values(price, month, position, window)
+            statistics_df[f"rolling_mean_{window}"] = mean
+            statistics_df[f"rolling_std_{window}"] = std
+            statistics_df[f"volatility_{window}"] = _rolling_values(
+                monthly_return, month, position, window
+            )[1]
+            statistics_df[f"zscore_{window}"] = np.where(
+                std > 0, (price - mean) / std, np.nan
+            )
+
+    return statistics_df
+
 # Data Enrichment
 
 def generate_food_price_index_data(data, widget_date_range, widget_market_values, widget_commodity_values):
@@ -1,7 +1,25 @@
+import functools
 import numpy as np
 import pandas as pd
-import altair as alt
-alt.data_transformers.enable('vegafusion')
+
+from data import compute_series_statistics
+
+@functools.lru_cache(maxsize=None)
+def load_altair():
+    """
+    Import Altair on first use and enable the VegaFusion data transformer and dark theme.
+
+    Returns
+    -------
+    module
+        The configured altair module.
+    """
+
+    import altair as alt
+    alt.data_transformers.enable('vegafusion')
+    alt.themes.enable('dark')
+
+    return alt
 
 def generate_figure_chart(data):
     """
@@ -48,17 +66,19 @@ def generate_figure_chart(data):
         .agg({"usdprice": "mean"})
         .reset_index()
     )
-    price_pivot = price_data.pivot_table(
-        index="date", 
-        columns=["market", "commodity", "unit"], 
-        values="usdprice"
+    latest_date = price_data["date"].max()
+    price_statistics = compute_series_statistics(price_data, lags=(1, 3, 12), windows=())
+    price_statistics = price_statistics[price_statistics["date"] == latest_date]
+
+    price_summary = (
+        price_data[["market", "commodity", "unit"]]
+        .drop_duplicates()
+        .sort_values(["market", "commodity", "unit"])
+        .merge(price_statistics, how="left", on=["market", "commodity", "unit"])
+        .rename(columns={"return_1": "mom", "return_3": "qoq", "return_12": "yoy"})
     )
-
-    price_summary = price_pivot.pct_change(1).iloc[-1].rename("mom").to_frame().reset_index()
-    price_summary["yoy"] = price_pivot.pct_change(12).iloc[-1].values
-    price_summary["qoq"] = price_pivot.pct_change(3).iloc[-1].values 
-    price_summary["usdprice"] = price_pivot.iloc[-1].values
-    price_summary["date"] = price_pivot.index[-1]
+    price_summary["date"] = latest_date
+    price_summary = price_summary[["market", "commodity", "unit", "mom", "yoy", "qoq", "usdprice", "date"]]
 
     return price_summary
 
@@ -87,6 +107,8 @@ def generate_line_chart(data):
     # Returns a list of Altair Chart objects for 'Rice' and 'Milk' with specified configurations.
     """
 
+    alt = load_altair()
+
     # Filter the data for the selected time period and markets
     price_data = data
 
@@ -1,7 +1,5 @@
 import streamlit as st
 import pandas as pd
-import altair as alt
-import plotly.express as px
 import math
 
 from data import *
@@ -13,7 +11,18 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded")
 
-alt.themes.enable("dark")
+@st.cache_data(show_spinner=False)
+def load_country_index():
+    return fetch_country_index()
+
+# The prepared data is read-only and kept as a shared resource, so reruns do not copy it.
+# Statistics only depend on earlier months of the same series, so they are computed once on
+# the prepared data and masked with the cleaning thresholds like the data itself.
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_country_data(country):
+    fill_data, abundance_data = prepare_clean_data(fetch_country_data(country, load_country_index()))
+    statistics_data = compute_series_statistics(fill_data, lags=(1, 3, 12), windows=(12,))
+    return fill_data, abundance_data, statistics_data
 
 # Sidebar
 with st.sidebar:
@@ -24,7 +33,7 @@ with st.sidebar:
         st.markdown('<p style="font-family:sans-serif; font-size: 24px;"><strong>Food Price Tracker</strong></p>', unsafe_allow_html=True)
 
     ## Country
-    country_options = sorted(fetch_country_index().index.to_list())
+    country_options = sorted(load_country_index().index.to_list())
     country_dropdown = st.selectbox(
         label='Country',
         options=country_options,
@@ -32,9 +41,33 @@ with st.sidebar:
         placeholder="Select a country...",
         )
 
+    ## Cleaning Thresholds
+    with st.expander('Cleaning Thresholds'):
+        date_threshold_slider = st.slider(
+            label='Date Abundance',
+            min_value=0.0,
+            max_value=1.0,
+            value=0.5,
+            step=0.05,
+            key=f'date_threshold_{country_dropdown}',
+            help='Minimum share of dates with a price for each (market, commodity) pair',
+            )
+        market_threshold_slider = st.slider(
+            label='Market Abundance',
+            min_value=0.0,
+            max_value=1.0,
+            value=0.7,
+            step=0.05,
+            key=f'market_threshold_{country_dropdown}',
+            help='Minimum share of markets with a price for each commodity',
+            )
+
 # Load data
-country_data = fetch_country_data(country_dropdown)
-country_data = get_clean_data(country_data)
+country_fill_data, country_abundance_data, country_statistics_data = load_country_data(country_dropdown)
+country_counts, min_date_allowed, max_date_allowed = summarize_abundance_thresholds(country_fill_data, country_abundance_data, date_threshold_slider, market_threshold_slider)
+if country_counts.empty:
+    st.warning('No data passes the cleaning thresholds. Please lower the thresholds.')
+    st.stop()
 
 # Sidebar
 with st.sidebar:
@@ -50,10 +83,8 @@ with st.sidebar:
    
 
     ## Date
-    min_date_allowed = country_data.date.min()
-    max_date_allowed = country_data.date.max()
-    start_date = max(country_data.date.max() + pd.tseries.offsets.DateOffset(years=-2), country_data.date.min())
-    end_date = country_data.date.max()
+    start_date = max(max_date_allowed + pd.tseries.offsets.DateOffset(years=-2), min_date_allowed)
+    end_date = max_date_allowed
     date_range = st.date_input(
         label='Date',
         value=[start_date, end_date],
@@ -62,7 +93,7 @@ with st.sidebar:
         )
 
     ## Commodity
-    commodities_options = country_data.commodity.value_counts().index.tolist()
+    commodities_options = country_counts.groupby('commodity').sum().sort_values(ascending=False, kind='stable').index.tolist()
     commodities_selection = commodities_options[:2]
     commodities_dropdown = st.multiselect(label='Commodities', 
                                           options=commodities_options, 
@@ -71,7 +102,7 @@ with st.sidebar:
                                           )
 
     ## Market
-    markets_options = country_data.market.value_counts().index.tolist()
+    markets_options = country_counts.groupby('market').sum().sort_values(ascending=False, kind='stable').index.tolist()
     markets_selection = markets_options[:2]
     markets_dropdown = st.multiselect(label='Markets', 
                                       options=markets_options, 
@@ -88,10 +119,13 @@ with st.sidebar:
         )
 
 # Elements
+country_data = apply_abundance_thresholds(country_fill_data, country_abundance_data, date_threshold_slider, market_threshold_slider, markets_dropdown, commodities_dropdown)
 country_data = generate_food_price_index_data(country_data, pd.to_datetime(date_range), markets_dropdown, commodities_dropdown)
 country_data = generate_overall_data(country_data)
 country_lines = generate_line_chart(country_data)
 country_figures = generate_figure_chart(country_data)
+country_statistics = country_statistics_data[country_statistics_data['date'].to_numpy() == pd.Timestamp(country_figures['date'].max()).to_datetime64()]
+country_statistics = country_statistics[abundance_threshold_mask(country_statistics, country_abundance_data, date_threshold_slider, market_threshold_slider)].set_index(['market', 'commodity'])
 
 num_markets = len(markets_dropdown)
 num_commodities = len(commodities_dropdown)
@@ -178,10 +212,17 @@ for row_num, row in enumerate(rows_l0):
                         card_delta = f"{card_data['qoq'].iloc[0]:.2%} QoQ"
                     elif relative_change_dropdown == 'Year-over-Year':
                         card_delta = f"{card_data['yoy'].iloc[0]:.2%} YoY"
+                    card_key = (card_data['market'].iloc[0], card_data['commodity'].iloc[0])
+                    card_help = None
+                    if card_key in country_statistics.index:
+                        card_statistics = country_statistics.loc[card_key]
+                        if pd.notna(card_statistics['rolling_mean_12']) and pd.notna(card_statistics['volatility_12']):
+                            card_help = f"12-month average US${card_statistics['rolling_mean_12']:.2f}, volatility {card_statistics['volatility_12']:.2%}"
                     with st.container(border=True):
                         st.metric(label = card_name,
                                 value = card_value,
                                 delta = card_delta,
+                                help = card_help,
                                 )
                     secondary_num += 1
                 else: